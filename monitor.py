@@ -3,9 +3,17 @@ import subprocess
 import os
 import json
 import datetime
+import fcntl
+import selectors
 import sys
-import threading
-from typing import Any, Dict, Optional
+import time
+from itertools import islice
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # fallback su json della stdlib
+    orjson = None
 
 
 # =========================
@@ -15,6 +23,44 @@ DEFAULT_PROBE_PATH = "probes/test_exec.bt"
 PROBES_MAP_PATH = "config/probes_map.json"
 SESSIONS_DIR = "sessions"
 
+# letture da bpftrace a blocchi grandi invece che riga per riga
+READ_CHUNK_SIZE = 1 << 16
+
+# capacita' delle pipe di bpftrace (default Linux 64 KiB): assorbe i burst
+# mentre il loop principale scrive su disco
+PIPE_BUFFER_SIZE = 1 << 20
+F_SETPIPE_SZ = getattr(fcntl, "F_SETPIPE_SZ", 1031)
+
+# batching scritture su events.jsonl: una write() ogni 64 KiB o 200 ms
+EVENTS_FLUSH_BYTES = 64 * 1024
+EVENTS_FLUSH_INTERVAL_S = 0.2
+
+
+# =========================
+# JSON (orjson se disponibile)
+# =========================
+if orjson is not None:
+    # orjson.JSONDecodeError e' sottoclasse di json.JSONDecodeError
+    json_loads = orjson.loads
+
+    def json_dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    def json_dumps_pretty(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+else:
+
+    def json_loads(data: Any) -> Any:
+        # json.loads non accetta memoryview
+        return json.loads(bytes(data))
+
+    def json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    def json_dumps_pretty(obj: Any) -> bytes:
+        return json.dumps(obj, indent=2).encode("utf-8")
+
 
 # =========================
 # Utility
@@ -46,64 +92,107 @@ def create_session_dir(prefix: str = "") -> str:
     return session_path
 
 
+def enlarge_pipe(fd: int, size: int = PIPE_BUFFER_SIZE) -> None:
+    """Allarga il buffer della pipe (F_SETPIPE_SZ); se non si puo', resta il default."""
+    try:
+        fcntl.fcntl(fd, F_SETPIPE_SZ, size)
+    except OSError:
+        # EPERM oltre /proc/sys/fs/pipe-max-size, EINVAL su kernel senza supporto
+        pass
+
+
 def start_bpftrace(probe_path: str) -> subprocess.Popen:
     cmd = ["bpftrace", probe_path]
-    return subprocess.Popen(
+    proc = subprocess.Popen(
         cmd,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
-        text=True,
-        bufsize=1,  # line-buffered
+        text=False,  # bytes: orjson parsa direttamente senza decode
+        bufsize=0,  # letture dirette con os.read, nessun buffer Python
     )
+    enlarge_pipe(proc.stdout.fileno())
+    enlarge_pipe(proc.stderr.fileno())
+    return proc
 
 
-def drain_stream_to_file(stream, out_file):
-    """Legge continuamente uno stream (es. stderr) e lo scrive su file."""
-    try:
-        for line in stream:
-            if not line:
-                continue
-            out_file.write(line)
-            out_file.flush()
-    except Exception:
-        pass
+def write_all(fd: int, data: bytes) -> None:
+    """os.write fino a scrivere tutto il buffer (gestisce write parziali)."""
+    written = os.write(fd, data)
+    while written < len(data):
+        written += os.write(fd, memoryview(data)[written:])
 
 
-def normalize_event(obj: dict, probe_meta: dict, probe_code: str) -> dict:
-    """Assicura che l'evento rispetti lo schema minimo e applica fallback da config."""
-    if "schema_version" not in obj:
-        obj["schema_version"] = probe_meta.get("schema_version", 1)
+def make_normalizer(
+    probe_meta: dict, probe_code: str
+) -> Callable[[dict], Tuple[dict, bool]]:
+    """
+    Ritorna normalize(obj) -> (obj, changed): assicura che l'evento rispetti lo
+    schema minimo e applica i fallback da config. probe_meta e' costante per
+    tutta la sessione, quindi i fallback vengono risolti qui una volta sola e
+    non per ogni evento.
+
+    changed e' True solo se un campo gia' presente e' stato riscritto; le
+    chiavi mancanti vengono solo aggiunte in coda, con valori costanti.
+    """
+    schema_version = probe_meta.get("schema_version", 1)
 
     # fallback type/event se mancanti
-    if "type" not in obj and "type" in probe_meta:
-        obj["type"] = probe_meta["type"]
-    if "event" not in obj and "event" in probe_meta and probe_meta["event"] != "*":
-        obj["event"] = probe_meta["event"]
+    has_type = "type" in probe_meta
+    fallback_type = probe_meta.get("type")
+    has_event = "event" in probe_meta and probe_meta["event"] != "*"
+    fallback_event = probe_meta.get("event")
+
+    def normalize(obj: dict) -> Tuple[dict, bool]:
+        changed = False
+        if "schema_version" not in obj:
+            obj["schema_version"] = schema_version
 
-    # assicura data object
-    if "data" not in obj or not isinstance(obj["data"], dict):
-        obj["data"] = {}
+        if has_type and "type" not in obj:
+            obj["type"] = fallback_type
+        if has_event and "event" not in obj:
+            obj["event"] = fallback_event
 
-    # aggiunta: tag sessione/probe (utile per correlare anche fuori dalla cartella)
-    if probe_code:
-        obj.setdefault("probe_code", probe_code)
+        # assicura data object
+        if "data" not in obj:
+            obj["data"] = {}
+        elif not isinstance(obj["data"], dict):
+            obj["data"] = {}
+            changed = True
 
-    return obj
+        # aggiunta: tag sessione/probe (utile per correlare anche fuori dalla cartella)
+        if probe_code:
+            obj.setdefault("probe_code", probe_code)
 
+        return obj, changed
 
-def validate_event(obj: dict, probe_meta: dict) -> Optional[str]:
-    """Ritorna una stringa di warning se non matcha la config, altrimenti None."""
+    return normalize
+
+
+def make_validator(probe_meta: dict) -> Callable[[dict], Optional[str]]:
+    """
+    Ritorna validate(obj): stringa di warning se l'evento non matcha la
+    config, altrimenti None. Come per il normalizer, i valori attesi sono
+    risolti una volta sola.
+    """
     expected_type = probe_meta.get("type")
     expected_event = probe_meta.get("event")
+    # event "*" = multi-evento, non validare
+    check_event = bool(expected_event) and expected_event != "*"
 
-    if expected_type and obj.get("type") and obj["type"] != expected_type:
-        return f"[WARN] type mismatch: got={obj.get('type')} expected={expected_type}"
+    def validate(obj: dict) -> Optional[str]:
+        if expected_type:
+            got = obj.get("type")
+            if got and got != expected_type:
+                return f"[WARN] type mismatch: got={got} expected={expected_type}"
 
-    # event "*" = multi-evento, non validare
-    if expected_event and expected_event != "*" and obj.get("event") and obj["event"] != expected_event:
-        return f"[WARN] event mismatch: got={obj.get('event')} expected={expected_event}"
+        if check_event:
+            got = obj.get("event")
+            if got and got != expected_event:
+                return f"[WARN] event mismatch: got={got} expected={expected_event}"
+
+        return None
 
-    return None
+    return validate
 
 
 def enrich_exec_event(event: dict) -> dict:
@@ -162,52 +251,134 @@ def main():
         "probe_code": probe_code,
         "probe_meta": probe_meta,
     }
-    with open(session_meta_path, "w", encoding="utf-8") as f:
-        json.dump(session_meta, f, indent=2)
+    with open(session_meta_path, "wb") as f:
+        f.write(json_dumps_pretty(session_meta))
 
     # avvia bpftrace
     print(f"[*] Starting bpftrace: {probe_path}")
     proc = start_bpftrace(probe_path)
 
-    with open(events_file_path, "w", encoding="utf-8") as events_file, open(
-        stderr_file_path, "w", encoding="utf-8"
-    ) as stderr_file:
-        # thread che drena stderr di bpftrace (errori/diagnostica)
-        t = threading.Thread(
-            target=drain_stream_to_file, args=(proc.stderr, stderr_file), daemon=True
-        )
-        t.start()
+    # events.jsonl scritto a blocchi direttamente sul fd (una write per batch)
+    events_fd = os.open(events_file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_APPEND, 0o644)
 
+    with open(stderr_file_path, "wb") as stderr_file:
         print("[*] Monitoring started. Press Ctrl-C to stop.")
 
+        # eventi serializzati in attesa di essere scritti su disco
+        buf = bytearray()
+        last_flush = time.monotonic()
+
+        def flush_batch() -> None:
+            nonlocal last_flush
+            if buf:
+                write_all(events_fd, buf)
+                buf.clear()
+            stderr_file.flush()
+            last_flush = time.monotonic()
+
+        normalize = make_normalizer(probe_meta, probe_code)
+        validate = make_validator(probe_meta)
+
+        # chiavi aggiunte da normalize -> frammento JSON gia' serializzato
+        # (i valori vengono da probe_meta, costanti per la sessione)
+        tails: Dict[Tuple[str, ...], bytes] = {}
+
+        def process_line(line) -> None:
+            """line: una riga (bytes o memoryview), senza newline finale."""
+            try:
+                # spazi e CR ai bordi sono whitespace JSON valido: niente strip()
+                obj = json_loads(line)
+            except ValueError:  # JSONDecodeError o UTF-8 non valido
+                text = bytes(line).strip()
+                if text:
+                    stderr_file.write(text + b"\n")
+                return
+
+            # {} vuoto o non-oggetto: niente da riusare della riga originale
+            n_keys = len(obj) if isinstance(obj, dict) else 0
+
+            obj, changed = normalize(obj)
+            if obj.get("event") == "exec":
+                obj = enrich_exec_event(obj)
+                changed = True
+            warn = validate(obj)
+            if warn:
+                stderr_file.write(warn.encode("utf-8") + b"\n")
+
+            if changed or not n_keys:
+                buf.extend(json_dumps(obj))
+                buf.extend(b"\n")
+                return
+
+            # riga originale cosi' com'e': le chiavi aggiunte da normalize
+            # vengono inserite prima della '}' finale, senza riserializzare
+            added = tuple(islice(obj, n_keys, None))
+            start, end = 0, len(line) - 1
+            # '{' e '}' esterni, saltando eventuali spazi/CR ai bordi
+            while line[start] != 0x7B:
+                start += 1
+            while line[end] != 0x7D:
+                end -= 1
+            buf.extend(line[start:end])
+            if added:
+                tail = tails.get(added)
+                if tail is None:
+                    tail = tails[added] = b"".join(
+                        b"," + json_dumps(k) + b":" + json_dumps(obj[k]) for k in added
+                    )
+                buf.extend(tail)
+            buf.extend(b"}\n")
+
+        # un solo thread: epoll su stdout (eventi) e stderr (diagnostica) di
+        # bpftrace, si legge da quello pronto
+        sel = selectors.DefaultSelector()
+        sel.register(proc.stdout, selectors.EVENT_READ, "out")
+        sel.register(proc.stderr, selectors.EVENT_READ, "err")
+
+        # byte letti da stdout non ancora consumati (riga incompleta in coda)
+        pending = bytearray()
+
         try:
-            for line in proc.stdout:
-                line = line.strip()
-                if not line:
-                    continue
-
-                try:
-                    obj = json.loads(line)
-                except json.JSONDecodeError:
-                    stderr_file.write(line + "\n")
-                    stderr_file.flush()
-                    continue
-
-                obj = normalize_event(obj, probe_meta, probe_code)
-                if obj.get("event") == "exec":
-                    obj = enrich_exec_event(obj)
-                warn = validate_event(obj, probe_meta)
-                if warn:
-                    stderr_file.write(warn + "\n")
-                    stderr_file.flush()
-
-                events_file.write(json.dumps(obj) + "\n")
-                events_file.flush()
+            while sel.get_map():
+                for key, _ in sel.select(timeout=EVENTS_FLUSH_INTERVAL_S):
+                    chunk = os.read(key.fd, READ_CHUNK_SIZE)
+                    if not chunk:
+                        # EOF su questo stream
+                        sel.unregister(key.fileobj)
+                        continue
+                    if key.data == "out":
+                        pending += chunk
+                        # scansione per offset: ogni riga e' una vista su
+                        # pending, nessuna copia per evento
+                        start = 0
+                        with memoryview(pending) as view:
+                            end = pending.find(b"\n")
+                            while end >= 0:
+                                if end > start:
+                                    process_line(view[start:end])
+                                start = end + 1
+                                end = pending.find(b"\n", start)
+                        del pending[:start]
+                    else:
+                        stderr_file.write(chunk)
+
+                if (
+                    len(buf) >= EVENTS_FLUSH_BYTES
+                    or time.monotonic() - last_flush >= EVENTS_FLUSH_INTERVAL_S
+                ):
+                    flush_batch()
+
+            # EOF: ultima riga senza newline finale
+            if pending:
+                process_line(pending)
 
         except KeyboardInterrupt:
             print("\n[*] Stopping monitor (Ctrl-C received)...")
         finally:
             print("[*] Cleaning up...")
+            sel.close()
+            flush_batch()
+            os.close(events_fd)
             try:
                 proc.terminate()
             except Exception:
@@ -219,8 +390,8 @@ def main():
 
             # aggiorna meta
             session_meta["stopped_at"] = datetime.datetime.now().isoformat()
-            with open(session_meta_path, "w", encoding="utf-8") as f:
-                json.dump(session_meta, f, indent=2)
+            with open(session_meta_path, "wb") as f:
+                f.write(json_dumps_pretty(session_meta))
 
             print(f"[*] Session saved in: {session_dir}")
             print("[*] Monitor stopped.")
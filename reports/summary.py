@@ -17,12 +17,64 @@ Usage:
 """
 
 import argparse
+import heapq
 import json
+from array import array
+from itertools import chain, compress, repeat
+import mmap
+from operator import eq, itemgetter
 import sys
 from collections import Counter, defaultdict
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Container, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python fallback
+    np = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers can
+# keep catching the stdlib exception either way.
+json_loads = orjson.loads if orjson is not None else json.loads
+
+
+# Process timelines are rendered for this many top processes (by event count)
+TIMELINE_TOP_PROCESSES = 5
+
+# Busiest binder IPC edges listed in the report (and ranked in index.json)
+IPC_GRAPH_TOP_EDGES = 10
+
+# Event names read by each sub-analysis: compute_analytics hands every one
+# of them only its own rows instead of the whole session. Binder and network
+# names map to the branch of the sub-analysis loop that handles them, so the
+# loop dispatches with one dict lookup instead of a chain of comparisons.
+_TX, _ALLOC_BUF, _RECEIVED = range(3)
+BINDER_EVENTS = {
+    "binder_transaction": _TX,
+    "binder_transaction_alloc_buf": _ALLOC_BUF,
+    "binder_transaction_received": _RECEIVED,
+}
+RESOURCE_EVENTS = frozenset({"openat", "connect", "execve"})
+_BIND, _ACCEPT, _SENDTO, _RECVFROM = range(4)
+NETWORK_EVENTS = {"bind": _BIND, "accept": _ACCEPT, "sendto": _SENDTO, "recvfrom": _RECVFROM}
+
+# Short string fields repeated on every event; load_events keeps a single
+# copy of each distinct value
+LABEL_FIELDS = ("type", "event", "comm")
+
+# Sample count from which percentiles() hands the work to numpy (measured
+# crossover of np.partition vs sorted() is ~100 values)
+PERCENTILE_NUMPY_MIN = 128
+
+# Shared read-only stand-in for a missing or non-object "data" field, so the
+# per-event loops don't allocate a fresh {} default on every lookup.
+_EMPTY: Dict[str, Any] = {}
 
 
 # -------------------------
@@ -42,20 +94,68 @@ def _parse_iso_datetime(s: str) -> Optional[datetime]:
 
 def load_events(events_path: Path) -> List[Dict[str, Any]]:
     events: List[Dict[str, Any]] = []
-    with events_path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                obj = json.loads(line)
-                if isinstance(obj, dict):
-                    events.append(obj)
-            except json.JSONDecodeError:
-                continue
+    loads = json_loads
+    append = events.append
+    labels: Dict[str, str] = {}  # label -> the one shared copy of it
+    with events_path.open("rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file: nothing to map
+            return events
+        # Lines are cut straight out of the page cache by offset: no
+        # buffered-reader copies, one bytes object per line.
+        with mm:
+            # single front-to-back scan: let the kernel read ahead aggressively
+            # (and drop pages behind us) where madvise is available
+            if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            find = mm.find
+            size = len(mm)
+            start = 0
+            while start < size:
+                end = find(b"\n", start)
+                if end < 0:
+                    end = size
+                line = mm[start:end].strip()
+                start = end + 1
+                # Only JSON objects are events: anything else is skipped
+                # without going through the decoder (and its exception path).
+                if not line.startswith(b"{"):
+                    continue
+                try:
+                    ev = loads(line)
+                except json.JSONDecodeError:
+                    continue
+                # The decoder makes a new string for every occurrence; keep
+                # one object per distinct label across the whole session.
+                for k in LABEL_FIELDS:
+                    v = ev.get(k)
+                    if type(v) is str:
+                        ev[k] = labels.setdefault(v, v)
+                append(ev)
     return events
 
 
+def write_index(index_path: Path, summary: Dict[str, Any]) -> None:
+    """
+    Writes index.json, indented. With orjson the whole document is encoded
+    in C (non-ASCII text is written as UTF-8 instead of \\u escapes); the
+    stdlib encoder is the fallback, also for what orjson refuses to encode
+    (integers beyond 64 bit, nesting deeper than 255 levels).
+    """
+    if orjson is not None:
+        try:
+            index_path.write_bytes(orjson.dumps(
+                summary,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+            ))
+            return
+        except orjson.JSONEncodeError:
+            pass
+    with index_path.open("w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+
 def load_session_metadata(session_path: Path) -> Optional[Dict[str, Any]]:
     session_file = session_path / "session.json"
     if not session_file.exists():
@@ -81,33 +181,68 @@ def get_ts_ns(ev: Dict[str, Any]) -> Optional[int]:
         return None
 
 
-def sort_events_by_time(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def sort_events_by_time(
+    events: List[Dict[str, Any]], ts_ns: Optional[List[Optional[int]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Sorts events by ts_ns in place and returns them. ts_ns: the get_ts_ns()
+    value of each event, if the caller already has them.
+    """
     if not events:
         return events
-    has_ts = any(get_ts_ns(e) is not None for e in events)
-    if not has_ts:
+    if ts_ns is None:
+        ts_ns = [get_ts_ns(e) for e in events]
+    if all(t is None for t in ts_ns):
         return events  # keep original order
-    # Put events without ts_ns at the end
-    return sorted(events, key=lambda e: (get_ts_ns(e) is None, get_ts_ns(e) or 0))
+    # Keys parsed once per event; events without ts_ns get +inf so they end
+    # up at the end (the sort is stable, so they keep their order). Sorting
+    # the indices by plain int keys leaves every comparison in C.
+    inf = float("inf")
+    keys = [inf if t is None else t for t in ts_ns]
+    order = sorted(range(len(events)), key=keys.__getitem__)
+    events[:] = [events[i] for i in order]
+    return events
 
 
-def window_rate(events: List[Dict[str, Any]], window_s: float = 1.0) -> Dict[str, Any]:
-    ts_list = [get_ts_ns(e) for e in events]
-    ts_list = [t for t in ts_list if t is not None]
-    if len(ts_list) < 2:
-        return {"available": False, "reason": "ts_ns missing or too few events"}
+def _window_counts(ts_list: Sequence[int], win_ns: int) -> Tuple[int, int, int]:
+    """
+    (peak window index, its event count, number of non-empty windows) for
+    ts_list split into win_ns-wide windows from its first timestamp. Ties
+    on the peak go to the earliest window.
+    """
+    if np is not None:
+        try:
+            arr = np.asarray(ts_list, dtype=np.int64)
+        except OverflowError:  # beyond int64: not a real ts_ns, use the slow path
+            arr = None
+        if arr is not None and arr.min() >= 0:
+            offs = (arr - arr.min()) // win_ns
+            if int(offs.max()) <= 4 * len(offs):
+                # dense window indexes: one histogram over them
+                counts = np.bincount(offs)
+                windows = np.flatnonzero(counts)
+                counts = counts[windows]
+            else:
+                # a far outlier would make the histogram huge: sort-based
+                windows, counts = np.unique(offs, return_counts=True)
+            i = int(counts.argmax())
+            return int(windows[i]), int(counts[i]), len(windows)
 
     ts0 = min(ts_list)
-    win_ns = int(window_s * 1e9)
+    buckets = Counter((t - ts0) // win_ns for t in ts_list)
+    peak_bucket = min(buckets, key=lambda b: (-buckets[b], b))
+    return peak_bucket, buckets[peak_bucket], len(buckets)
+
 
-    buckets = Counter()
-    for t in ts_list:
-        b = (t - ts0) // win_ns
-        buckets[b] += 1
+def window_rate(ts_list: Sequence[int], window_s: float = 1.0) -> Dict[str, Any]:
+    """ts_list: the ts_ns values of the session (events without one left out)."""
+    if len(ts_list) < 2:
+        return {"available": False, "reason": "ts_ns missing or too few events"}
 
-    peak_bucket, peak_count = max(buckets.items(), key=lambda kv: kv[1])
+    win_ns = int(window_s * 1e9)
+    peak_bucket, peak_count, total_windows = _window_counts(ts_list, win_ns)
     peak_rate = float(peak_count) / float(window_s)
-    avg_rate = (sum(buckets.values()) / max(len(buckets), 1)) / float(window_s)
+    avg_rate = (len(ts_list) / max(total_windows, 1)) / float(window_s)
 
     return {
         "available": True,
@@ -119,7 +254,7 @@ def window_rate(events: List[Dict[str, Any]], window_s: float = 1.0) -> Dict[str
             "count": int(peak_count),
         },
         "avg_rate": float(avg_rate),
-        "total_windows": int(len(buckets)),
+        "total_windows": int(total_windows),
     }
 
 
@@ -144,6 +279,76 @@ def percentile(sorted_vals: List[float], p: float) -> float:
     return float(sorted_vals[max(0, min(k, n - 1))])
 
 
+def count_labels(values: List[Any]) -> Counter:
+    """
+    Counter of the non-empty string values in a column. The counting runs
+    in C (Counter over a list) instead of one `c[k] += 1` per event; the
+    non-label keys (None, "", numbers) are dropped afterwards.
+    """
+    try:
+        counts = Counter(values)
+    except TypeError:  # unhashable junk (list/dict) somewhere in the column
+        counts = Counter(v for v in values if isinstance(v, str))
+    for k in [k for k in counts if not (isinstance(k, str) and k)]:
+        del counts[k]
+    return counts
+
+
+def count_labels_by(keys: List[Any], labels: List[Any]) -> Dict[str, Counter]:
+    """
+    key -> Counter(label) over two aligned columns, both restricted to
+    non-empty strings like count_labels(). The (key, label) pairs are
+    counted in C (Counter over zip) and then pivoted, so each inner Counter
+    keeps first-seen order.
+    """
+    try:
+        pairs = Counter(zip(keys, labels))
+    except TypeError:  # unhashable junk (list/dict) somewhere in a column
+        pairs = Counter(
+            (k, v) for k, v in zip(keys, labels) if isinstance(k, str) and isinstance(v, str)
+        )
+    by_key: Dict[str, Counter] = defaultdict(Counter)
+    for (k, v), n in pairs.items():
+        if isinstance(k, str) and k and isinstance(v, str) and v:
+            by_key[k][v] = n
+    return by_key
+
+
+def select_events(
+    events: List[Dict[str, Any]], names: List[Any], wanted: Container[str]
+) -> List[Dict[str, Any]]:
+    """
+    Rows whose event name (the aligned `names` column) is in `wanted`. The
+    membership test and the filtering both run in C, so a sub-analysis only
+    ever iterates the events it reads.
+    """
+    try:
+        mask = list(map(wanted.__contains__, names))
+    except TypeError:  # unhashable junk (list/dict) somewhere in the column
+        mask = [isinstance(e, str) and e in wanted for e in names]
+    return list(compress(events, mask))
+
+
+def percentiles(vals: Sequence[float], ps: Sequence[float]) -> List[float]:
+    """
+    Same indexing as percentile(), for several p at once. With numpy the
+    order statistics come from a single np.partition (O(n)) instead of a
+    full sort of boxed floats; below PERCENTILE_NUMPY_MIN values the array
+    round-trip costs more than the sort, so short lists stay in Python.
+    """
+    n = len(vals)
+    if np is None or n < PERCENTILE_NUMPY_MIN:
+        s = sorted(vals)
+        return [percentile(s, p) for p in ps]
+    ks = [max(0, min(int(p * (n - 1)), n - 1)) for p in ps]
+    if isinstance(vals, array):
+        arr = np.frombuffer(vals, dtype=np.float64)
+    else:
+        arr = np.asarray(vals, dtype=np.float64)
+    part = np.partition(arr, ks)
+    return [float(part[k]) for k in ks]
+
+
 def compute_event_rate(session_meta: Optional[Dict[str, Any]], total_events: int) -> Optional[Dict[str, float]]:
     if not session_meta:
         return None
@@ -173,50 +378,60 @@ def compute_binder_analytics(events: List[Dict[str, Any]]) -> Dict[str, Any]:
     Correlates binder_transaction, binder_transaction_alloc_buf, and
     binder_transaction_received by debug_id to build a full IPC picture.
     """
-    # Index alloc_buf and received by debug_id for O(1) join
+    # Index alloc_buf and received by debug_id for O(1) join. alloc/received
+    # can come after their transaction, so transactions are only collected
+    # here and joined once both indexes are complete.
     alloc_by_id: Dict[int, Dict] = {}
     received_by_id: Dict[int, Dict] = {}
+    pending_tx: List[Dict[str, Any]] = []
 
     for ev in events:
         event = ev.get("event", "")
-        data = ev.get("data", {})
+        kind = BINDER_EVENTS.get(event) if isinstance(event, str) else None
+        if kind is None:
+            continue
+        data = ev.get("data")
+        if not isinstance(data, dict):
+            data = _EMPTY
+        if kind == _TX:
+            if data.get("reply") != 1:  # skip reply transactions for the graph
+                pending_tx.append(ev)
+            continue
         debug_id = data.get("debug_id")
         if debug_id is None:
             continue
-        if event == "binder_transaction_alloc_buf":
+        if kind == _ALLOC_BUF:
             alloc_by_id[debug_id] = ev
-        elif event == "binder_transaction_received":
+        else:
             received_by_id[debug_id] = ev
 
-    # Build transaction records
-    transactions = []
-    ipc_graph: Dict[Tuple[str, str], Dict] = {}  # (sender_comm, receiver_comm) -> stats
-    code_usage: Counter = Counter()
+    # IPC graph as parallel counters keyed by (sender_comm, receiver_comm)
+    edge_count: Counter = Counter()
+    edge_bytes: Counter = Counter()
+    edge_codes: Dict[Tuple[str, str], Counter] = defaultdict(Counter)
+    codes: List[Any] = []  # code of each transaction, counted after the loop
+    total_transactions = 0
     oneway_count = 0
     sync_count = 0
     total_bytes = 0
 
-    for ev in events:
-        if ev.get("event") != "binder_transaction":
-            continue
-        if ev.get("data", {}).get("reply") == 1:
-            continue  # skip reply transactions for the graph, count separately
-
-        data = ev.get("data", {})
+    for ev in pending_tx:
+        data = ev.get("data")
+        if not isinstance(data, dict):
+            data = _EMPTY
         debug_id = data.get("debug_id")
         sender_comm = ev.get("comm", "unknown")
-        sender_pid = ev.get("pid")
         to_pid = data.get("to_pid")
         code = data.get("code")
         oneway = data.get("oneway", 0)
 
         # Join with alloc_buf for payload size
-        alloc = alloc_by_id.get(debug_id, {})
-        data_size = alloc.get("data", {}).get("data_size", 0)
+        alloc_data = alloc_by_id.get(debug_id, _EMPTY).get("data")
+        data_size = alloc_data.get("data_size", 0) if isinstance(alloc_data, dict) else 0
         total_bytes += data_size or 0
 
         # Join with received to get receiver comm
-        recv = received_by_id.get(debug_id, {})
+        recv = received_by_id.get(debug_id, _EMPTY)
         receiver_comm = recv.get("comm", f"pid:{to_pid}" if to_pid else "unknown")
 
         if oneway:
@@ -225,39 +440,35 @@ def compute_binder_analytics(events: List[Dict[str, Any]]) -> Dict[str, Any]:
             sync_count += 1
 
         if code is not None:
-            code_usage[code] += 1
+            codes.append(code)
 
         # IPC graph edge
         edge = (sender_comm, receiver_comm)
-        if edge not in ipc_graph:
-            ipc_graph[edge] = {"count": 0, "total_bytes": 0, "codes": Counter()}
-        ipc_graph[edge]["count"] += 1
-        ipc_graph[edge]["total_bytes"] += data_size or 0
+        edge_count[edge] += 1
+        edge_bytes[edge] += data_size or 0
         if code is not None:
-            ipc_graph[edge]["codes"][code] += 1
-
-        transactions.append({
-            "debug_id": debug_id,
-            "sender_comm": sender_comm,
-            "sender_pid": sender_pid,
-            "receiver_comm": receiver_comm,
-            "to_pid": to_pid,
-            "code": code,
-            "oneway": bool(oneway),
-            "data_size": data_size,
-        })
+            edge_codes[edge][code] += 1
+        total_transactions += 1
 
-    # Serialize ipc_graph (Counter not JSON-serializable)
+    code_usage = Counter(codes)
+
+    # Serialize ipc_graph (Counter not JSON-serializable). Only the busiest
+    # IPC_GRAPH_TOP_EDGES, the ones the report lists, are ranked (a heap
+    # instead of sorting every edge); the rest follow in first-seen order.
+    top_edges = edge_count.most_common(IPC_GRAPH_TOP_EDGES)
+    top_set = {edge for edge, _ in top_edges}
+    rest = ((edge, count) for edge, count in edge_count.items() if edge not in top_set)
     ipc_graph_out = {}
-    for (src, dst), stats in sorted(ipc_graph.items(), key=lambda x: x[1]["count"], reverse=True):
+    for edge, count in chain(top_edges, rest):
+        src, dst = edge
         ipc_graph_out[f"{src} → {dst}"] = {
-            "count": stats["count"],
-            "total_bytes": stats["total_bytes"],
-            "top_codes": [{"code": k, "count": v} for k, v in stats["codes"].most_common(5)],
+            "count": count,
+            "total_bytes": edge_bytes[edge],
+            "top_codes": [{"code": k, "count": v} for k, v in edge_codes[edge].most_common(5)],
         }
 
     return {
-        "total_transactions": len(transactions),
+        "total_transactions": total_transactions,
         "oneway": oneway_count,
         "sync": sync_count,
         "total_bytes_transferred": total_bytes,
@@ -269,23 +480,12 @@ def compute_binder_analytics(events: List[Dict[str, Any]]) -> Dict[str, Any]:
 # -------------------------
 # Process tree
 # -------------------------
-def compute_process_tree(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+def compute_process_tree(pid_to_comm: Dict[int, str], pid_to_ppid: Dict[int, int]) -> Dict[str, Any]:
     """
-    Builds parent->children map from ppid field.
-    Returns both the tree structure and a flat list of known processes.
+    Builds parent->children map from the pid -> ppid map (last ppid seen
+    per pid). Returns both the tree structure and a flat list of known
+    processes.
     """
-    pid_to_comm: Dict[int, str] = {}
-    pid_to_ppid: Dict[int, int] = {}
-
-    for ev in events:
-        pid = ev.get("pid")
-        ppid = ev.get("ppid")
-        comm = ev.get("comm")
-        if isinstance(pid, int) and isinstance(comm, str) and comm:
-            pid_to_comm[pid] = comm
-        if isinstance(pid, int) and isinstance(ppid, int):
-            pid_to_ppid[pid] = ppid
-
     # Build children map
     children: Dict[int, List[int]] = defaultdict(list)
     for pid, ppid in pid_to_ppid.items():
@@ -296,14 +496,16 @@ def compute_process_tree(events: List[Dict[str, Any]]) -> Dict[str, Any]:
     all_pids = set(pid_to_ppid.keys())
     roots = [pid for pid, ppid in pid_to_ppid.items() if ppid not in all_pids]
 
-    def build_subtree(pid: int, depth: int = 0) -> Dict:
-        return {
-            "pid": pid,
-            "comm": pid_to_comm.get(pid, "?"),
-            "children": [build_subtree(c, depth + 1) for c in sorted(children.get(pid, []))],
-        }
-
-    tree = [build_subtree(r) for r in sorted(roots)]
+    # Depth-first with an explicit stack (no recursion limit on long
+    # parent chains): each node is appended to its parent's children list
+    # when popped; pushing in reverse keeps the children sorted by pid.
+    tree: List[Dict] = []
+    stack = [(r, tree) for r in sorted(roots, reverse=True)]
+    while stack:
+        pid, siblings = stack.pop()
+        node = {"pid": pid, "comm": pid_to_comm.get(pid, "?"), "children": []}
+        siblings.append(node)
+        stack.extend((c, node["children"]) for c in sorted(children.get(pid, []), reverse=True))
 
     # Also flat list for quick lookup
     flat = [
@@ -321,7 +523,7 @@ def compute_resource_map(events: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
     Aggregates the 'decoded' field by process and syscall type.
     Gives you: which files each process opened, which IPs it connected to,
-    which binaries it executed.
+    which binaries it executed. Only RESOURCE_EVENTS rows are relevant.
     """
     # comm -> { "openat": set of paths, "connect": set of IPs, "execve": set of binaries }
     by_comm: Dict[str, Dict[str, set]] = defaultdict(lambda: defaultdict(set))
@@ -330,12 +532,13 @@ def compute_resource_map(events: List[Dict[str, Any]]) -> Dict[str, Any]:
         if ev.get("type") != "syscall":
             continue
         event = ev.get("event", "")
+        if not isinstance(event, str) or event not in RESOURCE_EVENTS:
+            continue
         comm = ev.get("comm", "")
         decoded = ev.get("decoded", "").strip()
         if not decoded or not comm:
             continue
-        if event in ("openat", "connect", "execve"):
-            by_comm[comm][event].add(decoded)
+        by_comm[comm][event].add(decoded)
 
     # Serialize sets to sorted lists
     result = {}
@@ -350,70 +553,87 @@ def compute_resource_map(events: List[Dict[str, Any]]) -> Dict[str, Any]:
 # -------------------------
 # Network analytics
 # -------------------------
-def compute_network_analytics(events: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """
-    Analyses events from net_bind.bt, net_accept.bt, net_send.bt, net_recv.bt.
-    Produces: port landscape, server processes, data volume per process,
-    and a per-second bytes timeline.
+def compute_network_analytics(events: List[Dict[str, Any]], t0_ns: Optional[int] = None) -> Dict[str, Any]:
     """
-    # -- Port landscape (bind events) --
-    port_landscape: List[Dict] = []
-    for ev in events:
-        if ev.get("event") != "bind":
-            continue
-        data = ev.get("data", {})
-        if data.get("ret", -1) != 0:
-            continue  # only successful binds
-        port_landscape.append({
-            "comm":    ev.get("comm", "?"),
-            "pid":     ev.get("pid"),
-            "uid":     ev.get("uid"),
-            "decoded": ev.get("decoded", ""),
-            "ts":      ev.get("ts", ""),
-        })
-
-    # -- Server processes (accept events) --
-    accept_events: List[Dict] = []
-    for ev in events:
-        if ev.get("event") != "accept":
-            continue
-        data = ev.get("data", {})
-        if data.get("fd", -1) < 0:
-            continue  # failed accepts
-        accept_events.append({
-            "comm":    ev.get("comm", "?"),
-            "pid":     ev.get("pid"),
-            "uid":     ev.get("uid"),
-            "peer":    ev.get("decoded", "<unknown>"),
-            "ts":      ev.get("ts", ""),
-        })
+    Analyses events from net_bind.bt, net_accept.bt, net_send.bt, net_recv.bt
+    (only NETWORK_EVENTS rows are relevant). Produces: port landscape, server
+    processes, data volume per process, and a per-second bytes timeline.
 
-    # Flag non-system acceptors (uid >= 10000 are app UIDs on Android)
-    suspicious_acceptors = [
-        a for a in accept_events
-        if isinstance(a.get("uid"), int) and a["uid"] >= 10000
-    ]
-
-    # -- Data volume per process --
+    t0_ns: first ts_ns of the whole session, the origin of the timeline;
+    defaults to the first ts_ns among `events`.
+    """
+    port_landscape: List[Dict] = []  # successful binds
+    accept_events: List[Dict] = []  # server processes (successful accepts)
     send_by_comm:  Dict[str, int] = defaultdict(int)
     recv_by_comm:  Dict[str, int] = defaultdict(int)
     send_count:    Dict[str, int] = defaultdict(int)
     recv_count:    Dict[str, int] = defaultdict(int)
+    # bytes per second bucket
+    timeline_buckets: Dict[int, Dict[str, int]] = defaultdict(lambda: {"sent": 0, "recv": 0})
+
+    if t0_ns is None:
+        ts_ns_list = [t for t in map(get_ts_ns, events) if t is not None]
+        t0_ns = min(ts_ns_list) if ts_ns_list else None
 
+    # One pass; each event's fields are fetched once
     for ev in events:
-        comm = ev.get("comm", "?")
-        data = ev.get("data", {})
-        if ev.get("event") == "sendto":
+        event = ev.get("event")
+        kind = NETWORK_EVENTS.get(event) if isinstance(event, str) else None
+        if kind is None:
+            continue
+        data = ev.get("data")
+        if not isinstance(data, dict):
+            data = _EMPTY
+
+        if kind == _BIND:
+            if data.get("ret", -1) != 0:
+                continue  # only successful binds
+            port_landscape.append({
+                "comm":    ev.get("comm", "?"),
+                "pid":     ev.get("pid"),
+                "uid":     ev.get("uid"),
+                "decoded": ev.get("decoded", ""),
+                "ts":      ev.get("ts", ""),
+            })
+
+        elif kind == _ACCEPT:
+            if data.get("fd", -1) < 0:
+                continue  # failed accepts
+            accept_events.append({
+                "comm":    ev.get("comm", "?"),
+                "pid":     ev.get("pid"),
+                "uid":     ev.get("uid"),
+                "peer":    ev.get("decoded", "<unknown>"),
+                "ts":      ev.get("ts", ""),
+            })
+
+        elif kind == _SENDTO:
             sent = data.get("sent_bytes", 0)
             if isinstance(sent, int) and sent > 0:
+                comm = ev.get("comm", "?")
                 send_by_comm[comm] += sent
                 send_count[comm]   += 1
-        if ev.get("event") == "recvfrom":
+                ts_ns = get_ts_ns(ev)
+                if ts_ns is not None:
+                    timeline_buckets[ts_ns // int(1e9)]["sent"] += sent
+
+        else:  # _RECVFROM
             recv = data.get("recv_bytes", 0)
             if isinstance(recv, int) and recv > 0:
+                comm = ev.get("comm", "?")
                 recv_by_comm[comm] += recv
                 recv_count[comm]   += 1
+                ts_ns = get_ts_ns(ev)
+                if ts_ns is not None:
+                    timeline_buckets[ts_ns // int(1e9)]["recv"] += recv
 
+    # Flag non-system acceptors (uid >= 10000 are app UIDs on Android)
+    suspicious_acceptors = [
+        a for a in accept_events
+        if isinstance(a.get("uid"), int) and a["uid"] >= 10000
+    ]
+
+    # -- Data volume per process --
     all_comms = set(list(send_by_comm.keys()) + list(recv_by_comm.keys()))
     volume_by_comm = []
     for comm in sorted(all_comms):
@@ -426,31 +646,10 @@ def compute_network_analytics(events: List[Dict[str, Any]]) -> Dict[str, Any]:
         })
     volume_by_comm.sort(key=lambda x: x["sent_bytes"] + x["recv_bytes"], reverse=True)
 
-    # -- Network timeline: bytes per second bucket --
-    timeline_buckets: Dict[int, Dict[str, int]] = defaultdict(lambda: {"sent": 0, "recv": 0})
-    ts_ns_list = []
-
-    for ev in events:
-        ts_ns = get_ts_ns(ev)
-        if ts_ns is None:
-            continue
-        ts_ns_list.append(ts_ns)
-        data = ev.get("data", {})
-        if ev.get("event") == "sendto":
-            sent = data.get("sent_bytes", 0)
-            if isinstance(sent, int) and sent > 0:
-                bucket = ts_ns // int(1e9)
-                timeline_buckets[bucket]["sent"] += sent
-        if ev.get("event") == "recvfrom":
-            recv = data.get("recv_bytes", 0)
-            if isinstance(recv, int) and recv > 0:
-                bucket = ts_ns // int(1e9)
-                timeline_buckets[bucket]["recv"] += recv
-
     # Normalise timeline to relative seconds from first event
     timeline: List[Dict] = []
-    if ts_ns_list and timeline_buckets:
-        t0_bucket = min(ts_ns_list) // int(1e9)
+    if t0_ns is not None and timeline_buckets:
+        t0_bucket = t0_ns // int(1e9)
         for bucket in sorted(timeline_buckets.keys()):
             timeline.append({
                 "rel_s": int(bucket - t0_bucket),
@@ -478,76 +677,109 @@ def compute_network_analytics(events: List[Dict[str, Any]]) -> Dict[str, Any]:
 # -------------------------
 # Main analytics
 # -------------------------
-def compute_analytics(events: List[Dict[str, Any]]) -> Dict[str, Any]:
-    # sort for any time-based analysis and for timeline output
-    events_sorted = sort_events_by_time(events)
-
-    type_counter = Counter()
-    event_counter = Counter()
-
-    proc_total = Counter()  # comm -> total
-    proc_by_type = defaultdict(Counter)  # comm -> Counter(type)
-    proc_by_event = defaultdict(Counter)  # comm -> Counter(event)
-
-    syscall_counts = Counter()
-    syscall_errors = Counter()
-    syscall_lat_by_name = defaultdict(list)
-    all_lat_us: List[float] = []
-
-    # For timelines
-    timeline_by_pid = defaultdict(list)  # pid -> list of (ts_ns, ts, type, event)
-    pid_to_comm: Dict[int, str] = {}
+def compute_analytics(
+    events: List[Dict[str, Any]],
+    all_timelines: bool = False,
+    timeline_limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    all_timelines: keep the timeline of every pid in the result. By default
+    only pids of the top TIMELINE_TOP_PROCESSES processes get one, since
+    those are the only timelines the report renders.
+    timeline_limit: keep at most this many (earliest) entries per timeline;
+    the full per-pid count is in "timeline_events_by_pid" either way.
+    """
+    # sort for any time-based analysis and for timeline output. Sessions
+    # captured without kernel timestamps carry no ts_ns key at all: a key
+    # probe (stops at the first hit) skips parsing and sorting for them.
+    if any("ts_ns" in ev for ev in events):
+        ts_col = [get_ts_ns(ev) for ev in events]
+        events_sorted = sort_events_by_time(events, ts_col)
+    else:
+        ts_col = []
+        events_sorted = events  # keep original order
+
+    # Struct-of-arrays view of the fields used below: one list per field,
+    # aligned by position, so each pass only touches the columns it needs.
+    # (load_events shares one string per distinct label, so the Counter/dict
+    # probes below mostly hit the identity fast path.)
+    types = [ev.get("type") for ev in events_sorted]
+    names = [ev.get("event") for ev in events_sorted]
+    comms = [ev.get("comm") for ev in events_sorted]
+    pids = [ev.get("pid") for ev in events_sorted]
+    stamps = [ev.get("ts") for ev in events_sorted]
+    # ts_ns parsed once (for the sort), shared by the rate, has_ts_ns and
+    # network timeline analytics below; ascending, like events_sorted
+    ts_ns_list = sorted([t for t in ts_col if t is not None])
+    is_syscall = list(map(eq, types, repeat("syscall")))
+
+    type_counter = count_labels(types)
+    event_counter = count_labels(names)
+    proc_total = count_labels(comms)  # comm -> total
+    syscall_counts = count_labels(list(compress(names, is_syscall)))
+
+    proc_by_type = count_labels_by(comms, types)  # comm -> Counter(type)
+    proc_by_event = count_labels_by(comms, names)  # comm -> Counter(event)
+
+    # timeline / pid mapping (last comm seen wins, like before)
+    pid_to_comm: Dict[int, str] = {
+        pid: comm
+        for pid, comm in zip(pids, comms)
+        if isinstance(pid, int) and isinstance(comm, str) and comm
+    }
+    # Second pass over the columns, now that the top processes are known:
+    # pid -> readable (ts, type, event) triples, already ordered by ts_ns.
+    if all_timelines:
+        timeline_pids = {pid for pid in pids if isinstance(pid, int)}
+    else:
+        top_comms = {comm for comm, _ in proc_total.most_common(TIMELINE_TOP_PROCESSES)}
+        timeline_pids = {pid for pid, comm in pid_to_comm.items() if comm in top_comms}
+    timeline_by_pid: Dict[int, List[Tuple[str, str, str]]] = defaultdict(list)
+    timeline_events: Counter = Counter()  # pid -> timeline length before the limit
+    keep = len(events_sorted) if timeline_limit is None else timeline_limit
+    for pid, ts, t, e in zip(pids, stamps, types, names):
+        if isinstance(pid, int) and pid in timeline_pids and isinstance(e, str) and e:
+            timeline_events[pid] += 1
+            if timeline_events[pid] <= keep:
+                timeline_by_pid[pid].append((ts if isinstance(ts, str) else "", t if isinstance(t, str) else "", e))
+
+    failed_syscalls: List[Any] = []  # event name of each syscall with ret < 0
+    # latencies as packed C doubles: 8 bytes per sample instead of a PyFloat
+    syscall_lat_by_name: Dict[str, array] = defaultdict(lambda: array("d"))
+    all_lat_us = array("d")
 
     # Collect syscall latency events separately for deeper analytics
+    # (only events whose "data" is a dict, so ev["data"] is safe on them)
     syscall_lat_events: List[Dict[str, Any]] = []
+    # (syscall, errno) of each failing latency event, for the errno breakdown
+    failures: List[Tuple[Any, int]] = []
 
-    for ev in events_sorted:
-        t = ev.get("type")
-        e = ev.get("event")
-        comm = ev.get("comm")
-        pid = ev.get("pid")
-        ts = ev.get("ts")
-        ts_ns = get_ts_ns(ev)
-
-        if isinstance(t, str) and t:
-            type_counter[t] += 1
-        if isinstance(e, str) and e:
-            event_counter[e] += 1
-
-        # process aggregations (only if comm is usable)
-        if isinstance(comm, str) and comm:
-            proc_total[comm] += 1
-            if isinstance(t, str) and t:
-                proc_by_type[comm][t] += 1
-            if isinstance(e, str) and e:
-                proc_by_event[comm][e] += 1
-
-        # timeline / pid mapping
-        if isinstance(pid, int):
-            if isinstance(comm, str) and comm:
-                pid_to_comm[pid] = comm
-            if isinstance(e, str) and e:
-                timeline_by_pid[pid].append((ts_ns, ts, t, e))
-
-        # syscall analytics
-        if t == "syscall":
-            if isinstance(e, str) and e:
-                syscall_counts[e] += 1
-
-            data = ev.get("data", {})
-            if isinstance(data, dict):
-                ret = data.get("ret")
-                lat = data.get("lat_us")
-
-                if isinstance(ret, int) and isinstance(e, str) and e and ret < 0:
-                    syscall_errors[e] += 1
-
-                if isinstance(lat, (int, float)):
-                    lat_f = float(lat)
-                    all_lat_us.append(lat_f)
-                    if isinstance(e, str) and e:
-                        syscall_lat_by_name[e].append(lat_f)
-                    syscall_lat_events.append(ev)
+    # syscall analytics: only the syscall rows are visited
+    for ev, e in zip(compress(events_sorted, is_syscall), compress(names, is_syscall)):
+        data = ev.get("data")
+        if isinstance(data, dict):
+            ret = data.get("ret")
+            lat = data.get("lat_us")
+
+            if isinstance(ret, int) and ret < 0:
+                failed_syscalls.append(e)
+
+            if isinstance(lat, (int, float)):
+                lat_f = float(lat)
+                all_lat_us.append(lat_f)
+                if isinstance(e, str) and e:
+                    syscall_lat_by_name[e].append(lat_f)
+                syscall_lat_events.append(ev)
+                # ret is almost always an int; errno_from_ret only for the rest
+                if isinstance(ret, int):
+                    if ret < 0:
+                        failures.append((e or "unknown", -ret))
+                elif ret is not None:
+                    eno = errno_from_ret(ret)
+                    if eno is not None:
+                        failures.append((e or "unknown", eno))
+
+    syscall_errors = count_labels(failed_syscalls)
 
     syscall_error_rates: Dict[str, float] = {}
     for name, cnt in syscall_counts.items():
@@ -556,13 +788,13 @@ def compute_analytics(events: List[Dict[str, Any]]) -> Dict[str, Any]:
 
     latency_summary: Dict[str, Any] = {}
     if all_lat_us:
-        all_lat_us.sort()
+        lo, p50, p95, p99, hi = percentiles(all_lat_us, (0.0, 0.50, 0.95, 0.99, 1.0))
         latency_summary = {
-            "min_us": float(all_lat_us[0]),
-            "p50_us": percentile(all_lat_us, 0.50),
-            "p95_us": percentile(all_lat_us, 0.95),
-            "p99_us": percentile(all_lat_us, 0.99),
-            "max_us": float(all_lat_us[-1]),
+            "min_us": lo,
+            "p50_us": p50,
+            "p95_us": p95,
+            "p99_us": p99,
+            "max_us": hi,
             "n": int(len(all_lat_us)),
         }
 
@@ -570,19 +802,19 @@ def compute_analytics(events: List[Dict[str, Any]]) -> Dict[str, Any]:
     for name, vals in syscall_lat_by_name.items():
         if not vals:
             continue
-        vals.sort()
+        p50, p95, p99, hi = percentiles(vals, (0.50, 0.95, 0.99, 1.0))
         latency_by_syscall[name] = {
-            "p50_us": percentile(vals, 0.50),
-            "p95_us": percentile(vals, 0.95),
-            "p99_us": percentile(vals, 0.99),
-            "max_us": float(vals[-1]),
+            "p50_us": p50,
+            "p95_us": p95,
+            "p99_us": p99,
+            "max_us": hi,
             "n": int(len(vals)),
         }
 
     # NEW: time/rate analytics based on ts_ns
     time_analytics = {
-        "has_ts_ns": any(get_ts_ns(e) is not None for e in events_sorted),
-        "rate_1s": window_rate(events_sorted, window_s=1.0),
+        "has_ts_ns": bool(ts_ns_list),
+        "rate_1s": window_rate(ts_ns_list, window_s=1.0),
     }
 
     # NEW: syscalls_latency deep analytics (outliers, p95 by comm, errno breakdown)
@@ -591,12 +823,14 @@ def compute_analytics(events: List[Dict[str, Any]]) -> Dict[str, Any]:
         # Top slowest
         def _lat_us(ev: Dict[str, Any]) -> int:
             try:
-                return int(ev.get("data", {}).get("lat_us"))
+                return int(ev["data"].get("lat_us"))
             except Exception:
                 return -1
 
         topN = 20
-        slowest = sorted(syscall_lat_events, key=_lat_us, reverse=True)[:topN]
+        # same rows and order as sorted(..., reverse=True)[:topN], without
+        # sorting every latency event
+        slowest = heapq.nlargest(topN, syscall_lat_events, key=_lat_us)
         syscalls_latency_deep["top_slowest"] = [
             {
                 "ts": ev.get("ts"),
@@ -605,8 +839,8 @@ def compute_analytics(events: List[Dict[str, Any]]) -> Dict[str, Any]:
                 "pid": ev.get("pid"),
                 "tid": ev.get("tid"),
                 "event": ev.get("event"),
-                "ret": ev.get("data", {}).get("ret"),
-                "lat_us": ev.get("data", {}).get("lat_us"),
+                "ret": ev["data"].get("ret"),
+                "lat_us": ev["data"].get("lat_us"),
             }
             for ev in slowest
         ]
@@ -618,45 +852,38 @@ def compute_analytics(events: List[Dict[str, Any]]) -> Dict[str, Any]:
             if not isinstance(comm, str) or not comm:
                 continue
             try:
-                by_comm[comm].append(int(ev.get("data", {}).get("lat_us")))
+                by_comm[comm].append(int(ev["data"].get("lat_us")))
             except Exception:
                 continue
 
-        def _p(vals: List[int], p: float) -> Optional[int]:
-            if not vals:
-                return None
-            s = sorted(vals)
-            idx = int(p * (len(s) - 1))
-            return s[idx]
-
         p95_by_comm = []
         for comm, vals in by_comm.items():
+            if not vals:  # every lat_us of this comm was NaN/inf
+                p95_by_comm.append({"comm": comm, "n": 0, "p50_us": None,
+                                    "p95_us": None, "p99_us": None, "max_us": None})
+                continue
+            # one sort per comm serves all three percentiles and the max
+            vals.sort()
+            last = len(vals) - 1
             p95_by_comm.append(
                 {
                     "comm": comm,
                     "n": len(vals),
-                    "p50_us": _p(vals, 0.50),
-                    "p95_us": _p(vals, 0.95),
-                    "p99_us": _p(vals, 0.99),
-                    "max_us": max(vals) if vals else None,
+                    "p50_us": vals[int(0.50 * last)],
+                    "p95_us": vals[int(0.95 * last)],
+                    "p99_us": vals[int(0.99 * last)],
+                    "max_us": vals[-1],
                 }
             )
         p95_by_comm.sort(key=lambda x: (x["p95_us"] is None, x["p95_us"] or -1), reverse=True)
         syscalls_latency_deep["p95_by_comm_top"] = p95_by_comm[:15]
 
-        # Errno breakdown
-        errno_global = Counter()
+        # Errno breakdown: the (syscall, errno) tokens were collected in the
+        # syscall pass above; one Counter pass over them here
+        errno_global = Counter(map(itemgetter(1), failures))
         errno_by_syscall = defaultdict(Counter)
-
-        for ev in syscall_lat_events:
-            data = ev.get("data", {}) if isinstance(ev.get("data"), dict) else {}
-            ret = data.get("ret")
-            eno = errno_from_ret(ret)
-            if eno is None:
-                continue
-            sc = ev.get("event") or "unknown"
-            errno_global[eno] += 1
-            errno_by_syscall[sc][eno] += 1
+        for (sc, eno), n in Counter(failures).items():
+            errno_by_syscall[sc][eno] = n
 
         syscalls_latency_deep["errno_global_top"] = [
             {"errno": k, "count": v} for k, v in errno_global.most_common(10)
@@ -667,10 +894,19 @@ def compute_analytics(events: List[Dict[str, Any]]) -> Dict[str, Any]:
         }
 
     # NEW: binder, process tree, resource map, network
-    binder_analytics = compute_binder_analytics(events_sorted)
-    process_tree = compute_process_tree(events_sorted)
-    resource_map = compute_resource_map(events_sorted)
-    network_analytics = compute_network_analytics(events_sorted)
+    # Each one only gets the rows it reads, picked from the names column.
+    binder_analytics = compute_binder_analytics(select_events(events_sorted, names, BINDER_EVENTS))
+    pid_to_ppid: Dict[int, int] = {
+        pid: ppid
+        for pid, ppid in zip(pids, [ev.get("ppid") for ev in events_sorted])
+        if isinstance(pid, int) and isinstance(ppid, int)
+    }
+    process_tree = compute_process_tree(pid_to_comm, pid_to_ppid)
+    resource_map = compute_resource_map(select_events(events_sorted, names, RESOURCE_EVENTS))
+    network_analytics = compute_network_analytics(
+        select_events(events_sorted, names, NETWORK_EVENTS),
+        t0_ns=min(ts_ns_list) if ts_ns_list else None,
+    )
 
     # Build base result (keeps your existing keys for compatibility)
     result = {
@@ -693,16 +929,11 @@ def compute_analytics(events: List[Dict[str, Any]]) -> Dict[str, Any]:
             "latency_overall": latency_summary,
             "latency_by_syscall": latency_by_syscall,
         },
-        "timeline_by_pid": {
-            str(pid): [
-                # store just the readable triple in index.json like before,
-                # but ordered by ts_ns already
-                (ts if isinstance(ts, str) else "", t if isinstance(t, str) else "", e if isinstance(e, str) else "")
-                for (_, ts, t, e) in timeline_by_pid[pid]
-            ]
-            for pid in timeline_by_pid
-        },
-        "pid_to_comm": {str(pid): pid_to_comm[pid] for pid in pid_to_comm},
+        # pid-keyed maps keep their int keys; both index.json writers turn
+        # them into JSON strings
+        "timeline_by_pid": dict(timeline_by_pid),
+        "timeline_events_by_pid": dict(timeline_events),
+        "pid_to_comm": pid_to_comm,
         # NEW keys
         "time": time_analytics,
         "syscalls_latency": syscalls_latency_deep,
@@ -829,33 +1060,47 @@ def build_report_text(
 
     # Process timelines (top 5 comm; pick pid with most events)
     lines.append("")
-    lines.append("Process timelines (top 5 processes):")
-    top5 = [comm for comm, _ in summary.get("top_processes", [])[:5]]
+    lines.append(f"Process timelines (top {TIMELINE_TOP_PROCESSES} processes):")
+    top5 = [comm for comm, _ in summary.get("top_processes", [])[:TIMELINE_TOP_PROCESSES]]
+    # pid keys are ints straight from compute_analytics, strings when the
+    # summary was read back from index.json: only used as lookup keys here
     pid_to_comm = summary.get("pid_to_comm", {})
     timeline_by_pid = summary.get("timeline_by_pid", {})
+    # timelines may be truncated: the full length per pid is stored apart
+    # (older index.json files only have the full timelines)
+    timeline_events = summary.get("timeline_events_by_pid") or {}
+
+    timeline_row = " {:>8} {:<8} {}".format  # one bound formatter for every row
+
+    def _timeline_len(pid: Any) -> int:
+        return timeline_events.get(pid, len(timeline_by_pid.get(pid, [])))
 
     comm_pids = defaultdict(list)
-    for pid_s, comm in (pid_to_comm or {}).items():
-        comm_pids[comm].append(pid_s)
+    for pid, comm in (pid_to_comm or {}).items():
+        comm_pids[comm].append(pid)
 
     for comm in top5:
         pids = comm_pids.get(comm, [])
         if not pids:
             continue
 
-        best_pid = max(pids, key=lambda ps: len(timeline_by_pid.get(ps, [])))
+        best_pid = max(pids, key=_timeline_len)
         tl = timeline_by_pid.get(best_pid, [])
 
         lines.append("")
         lines.append(f" {comm} (pid {best_pid})")
-        for (ts, t, e) in tl[:timeline_max_events]:
-            ts_s = ts if isinstance(ts, str) else ""
-            t_s = t if isinstance(t, str) else ""
-            e_s = e if isinstance(e, str) else ""
-            lines.append(f" {ts_s:>8} {t_s:<8} {e_s}")
+        lines.extend(
+            timeline_row(
+                ts if isinstance(ts, str) else "",
+                t if isinstance(t, str) else "",
+                e if isinstance(e, str) else "",
+            )
+            for (ts, t, e) in tl[:timeline_max_events]
+        )
 
-        if len(tl) > timeline_max_events:
-            lines.append(f" ... ({len(tl)} events total for this pid)")
+        n_events = _timeline_len(best_pid)
+        if n_events > timeline_max_events:
+            lines.append(f" ... ({n_events} events total for this pid)")
 
     # Network analytics
     network = summary.get("network", {})
@@ -957,8 +1202,8 @@ def build_report_text(
         ipc_graph = binder.get("ipc_graph", {})
         if ipc_graph:
             lines.append("")
-            lines.append(" IPC communication graph (top 10 edges):")
-            for edge, stats in list(ipc_graph.items())[:10]:
+            lines.append(f" IPC communication graph (top {IPC_GRAPH_TOP_EDGES} edges):")
+            for edge, stats in list(ipc_graph.items())[:IPC_GRAPH_TOP_EDGES]:
                 lines.append(f"  {edge}: {stats['count']} calls, {stats['total_bytes']} bytes")
 
     # Process tree
@@ -968,14 +1213,13 @@ def build_report_text(
         lines.append("")
         lines.append("Process tree:")
 
-        def render_tree(node: dict, indent: int = 0) -> None:
+        # pre-order walk with an explicit stack, children in stored order
+        stack = [(root, 0) for root in reversed(proc_tree.get("roots", []))]
+        while stack:
+            node, indent = stack.pop()
             prefix = "  " * indent + ("└─ " if indent > 0 else "")
             lines.append(f" {prefix}{node['comm']} (pid {node['pid']})")
-            for child in node.get("children", []):
-                render_tree(child, indent + 1)
-
-        for root in proc_tree.get("roots", []):
-            render_tree(root)
+            stack.extend((child, indent + 1) for child in reversed(node.get("children", [])))
 
     # Resource map
     resource_map = summary.get("resource_map", {})
@@ -1008,6 +1252,7 @@ def main() -> None:
     ap.add_argument("--out", default="reports/summaries", help="Output directory for saved summaries (default: reports/summaries)")
     ap.add_argument("--format", choices=["md", "txt"], default="md", help="Output format for saved summary (md or txt)")
     ap.add_argument("--timeline-max", type=int, default=25, help="Max events printed per timeline (default: 25)")
+    ap.add_argument("--all-timelines", action="store_true", help="Store every pid's full timeline in index.json, not only the first --timeline-max events of the top processes")
     args = ap.parse_args()
 
     session_path = Path(args.session_path).expanduser().resolve()
@@ -1019,15 +1264,16 @@ def main() -> None:
     session_id = session_path.name
 
     events = load_events(events_path)
-    base = compute_analytics(events)
+    # index.json keeps only what the report prints, unless --all-timelines
+    timeline_limit = None if args.all_timelines or args.timeline_max < 0 else args.timeline_max
+    base = compute_analytics(events, all_timelines=args.all_timelines, timeline_limit=timeline_limit)
 
     session_meta = load_session_metadata(session_path)
     base["event_rate"] = compute_event_rate(session_meta, base["total_events"])
 
     # Save index.json in the session directory
     index_path = session_path / "index.json"
-    with index_path.open("w", encoding="utf-8") as f:
-        json.dump(base, f, indent=2)
+    write_index(index_path, base)
 
     # Build report
     report_text = build_report_text(session_path, base, session_meta, timeline_max_events=args.timeline_max)